@@ -1,14 +1,16 @@
 import os
-import json
+import sys
+import asyncio
+import logging
+import orjson
+from functools import cache
 from typing import TypedDict, cast
 from dotenv import load_dotenv
 from langgraph.graph import StateGraph
 from langchain_core.runnables import Runnable
 from langchain_openai import ChatOpenAI
-from langchain.prompts import PromptTemplate
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import BaseMessage, HumanMessage
 from langgraph_flow.tool_executor import MCPToolExecutor
-import re
 
 load_dotenv()
 openai_api_key = os.getenv("OPENAI_API_KEY")
@@ -24,36 +26,41 @@ class FlowState(TypedDict):
 with open("prompts/tool_selector_prompt.txt") as f:
     raw_prompt = f.read()
 
-prompt = PromptTemplate.from_template(raw_prompt)
 llm = ChatOpenAI(model="gpt-4o", temperature=0.3)
 
 # Initialize the tool executor
 executor = MCPToolExecutor("calculator", command="python", args=["mcp_server/server.py"])
 
-# ----- LangGraph Nodes -----
-def input_node(state: FlowState) -> FlowState:
-    return state
+# Tool names reported by the MCP server, cached after startup
+_TOOL_NAMES: frozenset[str] = frozenset()
 
-import re
+async def _refresh_tool_names() -> frozenset[str]:
+    global _TOOL_NAMES
+    _TOOL_NAMES = frozenset(t.name for t in await executor.list_tools())
+    return _TOOL_NAMES
 
-async def plan_tool_call(state: FlowState) -> FlowState:
-    input_text = state["input"]
-    formatted_prompt = prompt.format(input=input_text)
-    response = await llm.ainvoke([HumanMessage(content=formatted_prompt)])
-    print("🧠 LLM Raw Response:", response.content)
+# ----- LangGraph Nodes -----
+def _parse_tool_call(state: FlowState, response: BaseMessage) -> FlowState:
+    logging.debug("🧠 LLM Raw Response: %s", response.content)
 
     try:
         content = response.content
         if isinstance(content, list):
             content = "".join(str(part) for part in content)
 
-        # ✅ Remove code block markdown (```json ... ```)
-        content = re.sub(r"```(?:json)?\n([\s\S]*?)```", r"\1", content).strip()
+        # ✅ Pure JSON goes straight to the parser; only slice out the object
+        # when the model wrapped it in code block markdown (```json ... ```)
+        content = content.strip()
+        if content.startswith("`"):
+            content = content[content.find("{"):content.rfind("}") + 1]
 
-        parsed = json.loads(content)
+        parsed = orjson.loads(content)
+        tool_name = parsed["tool_name"]
+        if not isinstance(tool_name, str):
+            raise TypeError(f"tool_name must be a string, got {type(tool_name).__name__}")
         return cast(FlowState, {
             **state,
-            "tool_name": parsed["tool_name"],
+            "tool_name": tool_name,
             "arguments": parsed["arguments"]
         })
     except Exception as e:
@@ -62,21 +69,30 @@ async def plan_tool_call(state: FlowState) -> FlowState:
             "output": f"❌ Failed to parse tool call: {e}\nRaw response: {response.content}"
         })
 
+async def plan_tool_call(state: FlowState) -> FlowState:
+    formatted_prompt = raw_prompt.format(input=state["input"])
+    response = await llm.ainvoke([HumanMessage(content=formatted_prompt)])
+    return _parse_tool_call(state, response)
+
 
 async def call_mcp_tool(state: FlowState) -> FlowState:
     tool_name = state["tool_name"]
     arguments = state["arguments"]
 
-    print(f"🔍 Calling tool: {tool_name}")
-    print(f"📦 Arguments: {arguments}")
+    # Planning failed: keep the parse error _parse_tool_call put in output
+    if state["output"]:
+        return state
 
-    # Validate tool exists
-    available_tools = [t.name for t in await executor.list_tools()]
-    if tool_name not in available_tools:
-        return cast(FlowState, {
-            **state,
-            "output": f"❌ Unknown tool selected: '{tool_name}'. Available tools: {available_tools}"
-        })
+    logging.debug("🔍 Calling tool: %s", tool_name)
+    logging.debug("📦 Arguments: %s", arguments)
+
+    # Validate tool exists (re-list from the server only on a cache miss)
+    if tool_name not in _TOOL_NAMES:
+        if tool_name not in await _refresh_tool_names():
+            return cast(FlowState, {
+                **state,
+                "output": f"❌ Unknown tool selected: '{tool_name}'. Available tools: {sorted(_TOOL_NAMES)}"
+            })
 
     try:
         result = await executor.execute_tool(tool_name, arguments)
@@ -87,43 +103,76 @@ async def call_mcp_tool(state: FlowState) -> FlowState:
 
 
 # ----- LangGraph Flow -----
+@cache
 def build_flow() -> Runnable:
     builder = StateGraph(FlowState)
-    builder.add_node("input", input_node)
     builder.add_node("plan", plan_tool_call)
     builder.add_node("call", call_mcp_tool)
 
-    builder.set_entry_point("input")
-    builder.add_edge("input", "plan")
+    builder.set_entry_point("plan")
     builder.add_edge("plan", "call")
     builder.set_finish_point("call")
 
     return builder.compile()
 
+# ----- Batch Runner -----
+async def plan_tool_calls(states: list[FlowState]) -> list[FlowState]:
+    # One abatch call lets the client issue the LLM requests concurrently
+    responses = await llm.abatch([
+        [HumanMessage(content=raw_prompt.format(input=s["input"]))] for s in states
+    ])
+    return [_parse_tool_call(s, r) for s, r in zip(states, responses)]
+
+# Batch counterpart of build_flow().ainvoke for serving several inputs at
+# once: plans them in one LLM batch, then calls their tools concurrently.
+# Starts the MCP client on first use; callers still own executor.cleanup().
+async def run_batch(states: list[FlowState]) -> list[FlowState]:
+    if executor.session is None:
+        await executor.initialize()
+        await _refresh_tool_names()
+    planned = await plan_tool_calls(states)
+    return await asyncio.gather(*(call_mcp_tool(s) for s in planned))
+
 # ----- Async Main Runner -----
-import asyncio
+async def _open_stdin() -> asyncio.StreamReader:
+    # Read stdin on the event loop so Ctrl-C can cancel a pending read; a
+    # worker thread blocked in input() would stall asyncio.run's shutdown
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    try:
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    except ValueError:
+        # stdin redirected from a regular file: it never blocks, read it up front
+        reader.feed_data(sys.stdin.buffer.read())
+        reader.feed_eof()
+    return reader
 
 async def main():
-    await executor.initialize()  # Initialize MCP client
-    tools = await executor.list_tools()
-    print("🔧 Available tools:", [t.name for t in tools])
-    flow = build_flow()
-
-    while True:
-        user_input = input("🧠 Ask me to calculate something: ")
-        if user_input.strip().lower() in ["exit", "quit"]:
-            break
-
-        state: FlowState = {
-            "input": user_input,
-            "tool_name": "",
-            "arguments": {},
-            "output": ""
-        }
-        result = await flow.ainvoke(state)
-        print("🧾 Result:", result["output"])
-
-    await executor.cleanup()  # Properly close MCP client
+    try:
+        await executor.initialize()  # Initialize MCP client
+        print("🔧 Available tools:", sorted(await _refresh_tool_names()))
+        flow = build_flow()
+        stdin = await _open_stdin()
+
+        while True:
+            print("🧠 Ask me to calculate something: ", end="", flush=True)
+            line = await stdin.readline()
+            if not line:
+                break
+            user_input = line.decode().rstrip("\n")
+            if user_input.strip().lower() in ["exit", "quit"]:
+                break
+
+            state: FlowState = {
+                "input": user_input,
+                "tool_name": "",
+                "arguments": {},
+                "output": ""
+            }
+            result = await flow.ainvoke(state)
+            print("🧾 Result:", result["output"])
+    finally:
+        await executor.cleanup()  # Properly close MCP client
 
 if __name__ == "__main__":
     asyncio.run(main())
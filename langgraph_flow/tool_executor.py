@@ -37,11 +37,7 @@ class MCPToolExecutor:
     async def list_tools(self) -> list[Tool]:
         assert self.session is not None
         tools_response = await self.session.list_tools()
-        tools = []
-        for item in tools_response:
-            if isinstance(item, tuple) and item[0] == "tools":
-                tools.extend([Tool(**tool) if isinstance(tool, dict) else tool for tool in item[1]])
-        return tools
+        return list(tools_response.tools)
 
     async def execute_tool(self, tool_name: str, arguments: dict[str, Any]) -> CallToolResult:
         assert self.session is not None
@@ -1,5 +1,7 @@
 import asyncio
 import math
+from collections.abc import Callable
+from functools import lru_cache
 from pydantic import BaseModel
 from mcp.types import Tool, TextContent
 from mcp.server import Server
@@ -11,6 +13,64 @@ class CalcInput(BaseModel):
 class ExpressionInput(BaseModel):
     expression: str
 
+# ⚠️ Safe eval namespace: math functions/constants only
+_MATH_NS = {k: v for k, v in math.__dict__.items() if not k.startswith("__")}
+
+@lru_cache(maxsize=256)
+def _compile_expr(expr: str):
+    # Reuse the code object for repeated expressions instead of re-parsing
+    return compile(expr, "<expr>", "eval")
+
+def _parse_literal(expr: str) -> int | float | None:
+    # Bare numbers don't need compile + eval; keep ints as ints like eval would
+    expr = expr.strip()
+    # int()/float() also accept non-ASCII digits, which aren't Python literals
+    if not expr.isascii():
+        return None
+    try:
+        value = int(expr)
+    except ValueError:
+        pass
+    else:
+        # int() accepts "010", a SyntaxError as a literal; all-zero "00" is fine
+        return None if value and expr.lstrip("+-").startswith("0") else value
+    try:
+        value = float(expr)
+    except ValueError:
+        return None
+    # Leave "inf"/"nan" spellings to eval so only math's names are accepted
+    return value if math.isfinite(value) else None
+
+def _fsum(nums: list[float]) -> float:
+    # fsum raises on inf overflow and inf + -inf where sum() yields inf/nan
+    try:
+        return math.fsum(nums)
+    except (OverflowError, ValueError):
+        return sum(nums)
+
+def _subtract(nums: list[float]) -> float:
+    return nums[0] - _fsum(nums[1:])
+
+def _divide(nums: list[float]) -> float:
+    divisors = nums[1:]
+    if 0 in divisors:
+        raise ZeroDivisionError
+    denom = math.prod(divisors)
+    if 0 < abs(denom) < math.inf:
+        return nums[0] / denom
+    # The product under/overflowed; divide step by step like the original loop
+    result = nums[0]
+    for n in divisors: result /= n
+    return result
+
+# Numeric tools: name -> reduction over CalcInput.numbers
+_HANDLERS: dict[str, Callable[[list[float]], float]] = {
+    "add": _fsum,
+    "subtract": _subtract,
+    "multiply": math.prod,
+    "divide": _divide,
+}
+
 async def serve() -> None:
     server = Server("calculator")
 
@@ -29,33 +89,27 @@ async def serve() -> None:
     @server.call_tool()
     async def call_tool(name: str, arguments: dict) -> list[TextContent]:
         try:
-            if name in {"add", "subtract", "multiply", "divide"}:
+            handler = _HANDLERS.get(name)
+            if handler is not None:
                 data = CalcInput(**arguments)
                 nums = data.numbers
                 if len(nums) < 2:
                     return [TextContent(type="text", text="❌ Provide at least two numbers.")]
-                result = nums[0]
-                if name == "add":
-                    result = sum(nums)
-                elif name == "subtract":
-                    for n in nums[1:]: result -= n
-                elif name == "multiply":
-                    result = 1
-                    for n in nums: result *= n
-                elif name == "divide":
-                    for n in nums[1:]:
-                        if n == 0:
-                            return [TextContent(type="text", text="❌ Division by zero")]
-                        result /= n
+                try:
+                    result = handler(nums)
+                except ZeroDivisionError:
+                    return [TextContent(type="text", text="❌ Division by zero")]
                 return [TextContent(type="text", text=f"✅ {name}: {nums} -> {result}")]
 
             elif name == "evaluate_expression":
                 expr = ExpressionInput(**arguments).expression
-                # ⚠️ Safe eval
-                allowed_names = {
-                    k: v for k, v in math.__dict__.items() if not k.startswith("__")
-                }
-                result = eval(expr, {"__builtins__": None}, allowed_names)
+                result = _parse_literal(expr)
+                if result is None:
+                    # eval(str) ignores leading whitespace but compile() doesn't
+                    code = _compile_expr(expr.strip())
+                    # Fresh globals/locals per call so nothing an expression does
+                    # (walrus, lambda.__globals__) can leak into _MATH_NS
+                    result = eval(code, {"__builtins__": None}, dict(_MATH_NS))
                 return [TextContent(type="text", text=f"✅ Expression: {expr} -> {result}")]
 
             return [TextContent(type="text", text=f"❌ Unknown tool: {name}")]